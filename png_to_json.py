@@ -2,6 +2,9 @@ import os
 import json
 from PIL import Image
 
+# Расширения файлов, в метаданных которых ищем workflow
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
 def read_exif_and_create_json(image_path):
     # Открываем изображение
     img = Image.open(image_path)
@@ -37,7 +40,7 @@ images_folder = os.path.normpath(images_folder)
 # Проходим по всем изображениям в папке
 for filename in os.listdir(images_folder):
     # print("---\nfilename: ",filename,)
-    if filename.endswith(".jpg") or filename.endswith(".jpeg") or filename.endswith(".png"):
+    if filename.endswith(IMAGE_EXTENSIONS):
         image_path = os.path.join(images_folder, filename)
         # print("----image_path",image_path)
         read_exif_and_create_json(image_path)
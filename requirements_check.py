@@ -7,7 +7,23 @@ import requests
 import subprocess
 from colorama import Fore, Style
 from collections import OrderedDict
-
+from functools import lru_cache
+
+# Shared requirement-line pattern: name, optional [extras], optional operator + version
+REQUIREMENT_PATTERN = re.compile(r'^([\w-]+)(?:\[(.*?)\])?(?:([!><=]+)(\d+(?:\.\d+)*))?')
+# Requirement "names" that are not PyPI packages and are reported as-is
+CUSTOM_REQUIREMENTS = frozenset({"git", "--extra-index-url"})
+VERSION_SEPARATOR_PATTERN = re.compile(r'[\.\-]')
+# Single-pass lookups in `pip show` / `pip index versions` output
+PIP_SHOW_PATTERN = re.compile(r'^Name:(.*)\r?\nVersion:(.*)$', re.MULTILINE)
+PACKAGE_NAME_SEPARATOR_PATTERN = re.compile(r'[-_.]+')
+PIP_AVAILABLE_VERSIONS_PATTERN = re.compile(r'^Available versions:(.*)$', re.MULTILINE)
+# pip/conda output is captured anyway, so a Windows child needs no console of its own.
+# Under python.exe children share the parent's console; this only matters without one
+# (pythonw), where each call would otherwise open a console window
+CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
+# One session for all PyPI lookups, so the HTTPS connection to pypi.org is reused
+pypi_session = requests.Session()
 
 def is_windows():
     return os.name == 'nt'
@@ -26,17 +42,34 @@ def choose_environment_type():
             sys.exit("Exiting script as requested.")
         print("Invalid choice. Please enter 1 for venv, 2 for conda, or 'NO' to exit.")
 
+# config.json is parsed once per run; save_config() keeps this copy in sync
+config_cache = None
+
+def load_config():
+    global config_cache
+    if config_cache is None:
+        # Read as bytes: json detects the encoding itself and accepts the BOM Notepad writes
+        with open(config_file, 'rb') as f:
+            config_cache = json.loads(f.read())
+    # Callers edit the dict before saving, so they get their own copy
+    return dict(config_cache)
+
+def save_config(config):
+    global config_cache
+    # Always written by stdlib json to keep the 4-space layout of config.json
+    with open(config_file, 'w') as f:
+        json.dump(config, f, indent=4)
+    config_cache = dict(config)
+
 def read_from_config(key, check=False):
 
     # config_file = 'config.json'
-    if not os.path.exists(config_file):
+    if config_cache is None and not os.path.exists(config_file):
         # Create an empty config file if it does not exist
-        with open(config_file, 'w') as f:
-            json.dump({}, f, indent=4)
+        save_config({})
         print(f"\tConfig file '{config_file}' created.")
 
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+    config = load_config()
             
     value = config.get(key)
 
@@ -48,8 +81,7 @@ def read_from_config(key, check=False):
             if key not in config:
                 value = choose_environment_type()
                 config[key] = value
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
                 return value
             else:
                 env_type = config.get(key)
@@ -89,8 +121,7 @@ def read_from_config(key, check=False):
                     # else:
                     #     return config.get(key)
 
-            with open(config_file, 'r') as f:
-                config = json.load(f)
+            config = load_config()
 
             # print("\tkey in config.keys()",key in config.keys())
             if key not in config.keys():
@@ -99,8 +130,7 @@ def read_from_config(key, check=False):
 
             # if value and (key not in ["project_path", "custom_nodes_path"] or os.path.exists(value)):
             #     config[key] = value
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
                 return choice
             # else:
             #     print(f"\tInvalid {key}. Please provide a valid value.")
@@ -116,8 +146,7 @@ def get_conda_path():
     choice = read_from_config("conda_path",check=True)
     print("choice",choice)
 
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+    config = load_config()
 
     if choice:
         return choice
@@ -149,15 +178,13 @@ def get_conda_path():
                 selected_path = existing_paths[int(choice) - 1]
                 # Save selected path to config
                 config['conda_path'] = selected_path
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
                 return selected_path
             elif choice == str(len(existing_paths) + 1):
                 custom_path = input("Enter custom conda.exe path: ")
                 # Save custom path to config
                 config['conda_path'] = custom_path
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
                 return custom_path
             else:
                 print("Invalid choice. Please try again.")
@@ -167,8 +194,7 @@ def get_conda_path():
 
 def get_conda_env():
     # print(">>> get_conda_env >>>")
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+    config = load_config()
     
     try:
         env_path = read_from_config("conda_env",check=True)
@@ -178,7 +204,7 @@ def get_conda_env():
             return env_path
         else:
             conda_path = get_conda_path()
-            result = subprocess.run([conda_path, 'env', 'list'], capture_output=True, text=True)
+            result = subprocess.run([conda_path, 'env', 'list'], capture_output=True, text=True, creationflags=CREATION_FLAGS)
             # print("result - ",result)
             env_list = [line.split()[0] for line in result.stdout.splitlines() if line.strip() and not line.startswith('#')]
             # print("env_list - ",env_list)
@@ -207,8 +233,7 @@ def get_conda_env():
                     selected_env
                     )
                 
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
                 return selected_env
 
             
@@ -218,8 +243,7 @@ def get_conda_env():
                 
                 config['conda_env'] = custom_path
                 config['conda_env_folder'] = custom_path
-                with open(config_file, 'w') as f:
-                    json.dump(config, f, indent=4)
+                save_config(config)
 
                 return custom_path
                 
@@ -241,7 +265,7 @@ def get_active_requirements(file_path):
                 gpackage = ""
                 for pair in pairs:
                     pair = pair.strip()
-                    match = re.match(r'([\w-]+)(?:\[(.*?)\])?(?:([!><=]+)(\d+(?:\.\d+)*))?', pair)
+                    match = REQUIREMENT_PATTERN.match(pair)
                     if match:
                         package, dopPack, operator, version = match.groups()
                         if package == "git":
@@ -260,10 +284,19 @@ def get_active_requirements(file_path):
                         active_requirements.append("".join([gpackage, pair]))
     return active_requirements
 
-def get_installed_version(package_name):
-    
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+def normalize_package_name(package_name):
+    # pip show reports the project's own spelling ("Pillow" for "pillow"), so compare PEP 503 names
+    return PACKAGE_NAME_SEPARATOR_PATTERN.sub('-', package_name).lower()
+
+def get_installed_versions(package_names):
+    # A single `pip show` for all packages: pip's start-up costs far more than each lookup.
+    # Lines such as "-e git+..." or "--index-url ..." yield option-like names; passed along,
+    # pip would reject the whole call, so they are left out (and "--" ends pip's options)
+    package_names = [name for name in package_names if not name.startswith('-')]
+    if not package_names:
+        return {}
+
+    config = load_config()
 
     env_type = config.get('env_type')
     try:
@@ -274,56 +307,59 @@ def get_installed_version(package_name):
                 python_executable = f"{env_name}python.exe"  # Use backslash for Windows paths
             else:  # Linux or other OS
                 python_executable = f"{env_name}/bin/python"  # Use forward slash for Linux paths            
-            result = subprocess.run(
-                [python_executable, '-m', 'pip', 'show', package_name], 
-                capture_output=True,
-                text=True,
-                check=True
-                )
+            command = [python_executable, '-m', 'pip', 'show', '--', *package_names]
         else:
-            result = subprocess.run(
-                ['pip', 'show', package_name], 
-                capture_output=True,
-                text=True,
-                check=True
-                )
+            command = ['pip', 'show', '--', *package_names]
 
-        if result.returncode == 0:
-            # print("__get_installed_version__",package_name, result.stdout)
-            for line in result.stdout.split('\n'):
-                if line.startswith('Version:'):
-                    return line.split(':', 1)[1].strip()
-        return None
+        # No check=True: pip exits with 1 if any package is missing, but still shows the others
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            text=True,
+            creationflags=CREATION_FLAGS
+            )
+
+        return {
+            normalize_package_name(name.strip()): version.strip()
+            for name, version in PIP_SHOW_PATTERN.findall(result.stdout)
+            }
     except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
+        # Runs once before the package reports, so it cannot belong to any one of them
+        print(f"Error while reading installed versions: {e}")
+        return {}
 
-def get_latest_version(package_name):
+# Errors go to `output` when given, so they stay with the report of their package
+def get_latest_version(package_name, output=None):
     try:
-        response = requests.get(f"https://pypi.org/pypi/{package_name}/json")
+        response = pypi_session.get(f"https://pypi.org/pypi/{package_name}/json")
         response.raise_for_status()
         package_info = response.json()
         latest_version = package_info["info"]["version"]
         return latest_version
     except requests.RequestException as e:
-        print(f"Error while retrieving data from PyPI: {e}")
+        message = f"Error while retrieving data from PyPI: {e}"
+        if output is None:
+            print(message)
+        else:
+            output.append(message)
         return None
     
+# Cached: a package with several "<" pins may ask again once its list is filtered empty
+@lru_cache(maxsize=None)
 def get_all_versions(package_name):
     try:
         result = subprocess.run(
             ['pip', 'index', 'versions', package_name], 
-            # capture_output=True,
-            stdout=subprocess.PIPE, 
-            stderr=subprocess.PIPE, 
+            capture_output=True,
             text=True,
             check=True,
+            creationflags=CREATION_FLAGS,
             )
         
         if result.returncode == 0:
-            for line in result.stdout.split('\n'):
-                if line.startswith('Available versions:'):
-                    return line.split(':', 1)[1].strip()
+            match = PIP_AVAILABLE_VERSIONS_PATTERN.search(result.stdout)
+            if match:
+                return match.group(1).strip()
         
         # return result
     except requests.RequestException as e:
@@ -332,8 +368,7 @@ def get_all_versions(package_name):
 
 def activate_virtual_environment():
     # config_file = 'config.json'
-    with open(config_file, 'r') as f:
-        config = json.load(f)
+    config = load_config()
 
     env_type = config.get('env_type')
 
@@ -394,7 +429,8 @@ def activate_conda_environment():
     print(f"--> Commands to activate Conda environment <--\n" + 
           Fore.BLUE + activation_script + "\n" + Style.RESET_ALL)
 
-    process = subprocess.Popen(activate_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=os.environ)
+    process = subprocess.Popen(activate_command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=os.environ,
+                               creationflags=CREATION_FLAGS)
     stdout, stderr = process.communicate()
     if process.returncode != 0:
         print(f"Error activating Conda environment: {stderr.decode('windows-1252')}")
@@ -406,8 +442,7 @@ def activate_conda_environment():
 
 
 def parse_conditional_dependencies(dependency, directory):
-    pattern = re.compile(r'^([\w-]+)(?:\[(.*?)\])?(?:([!><=]+)(\d+(?:\.\d+)*))?')
-    match = pattern.match(dependency)
+    match = REQUIREMENT_PATTERN.match(dependency)
     if match:
         package_name = match.group(1)
         conditions = match.group(2)
@@ -450,15 +485,9 @@ def combine_names(input_ordered_dict):
 
 def parse_version(version_str):
     # Разделение на части: основная версия и любые постфиксы
-    parts = re.split(r'[\.\-]', version_str)
-    version_tuple = []
-    for part in parts:
-        if part.isdigit():
-            version_tuple.append(int(part))
-        else:
-            # Для буквенных частей добавим кортеж с числом и самой строкой
-            version_tuple.append((part,))
-    return tuple(version_tuple)
+    # Для буквенных частей добавим кортеж с числом и самой строкой
+    return tuple(int(part) if part.isdigit() else (part,)
+                 for part in VERSION_SEPARATOR_PATTERN.split(version_str))
 
 def main():
     global config_file
@@ -491,100 +520,106 @@ def main():
 
         for dir in dirs:
             # print("dir",dir)
-            subroot, subdirs, subfiles = next(os.walk(os.path.join(root, dir)))
-            # print("\t",subroot, subdirs, subfiles)
-            for file in subfiles:
-                if file == 'requirements.txt':
-                    file_path = os.path.join(root, dir, file)
-                    # folder = file_path.split(os.path.abspath(directory))[-1].split("\\")[1]
-                    # folder = os.path.basename(os.path.abspath(directory))
-                    folder = dir
-                    active_requirements = get_active_requirements(file_path)
-                    for requirement in active_requirements:
-                        packages = parse_conditional_dependencies(requirement, folder)
-                        for package in packages:
-                            if package not in requirements_dict:
-                                requirements_dict[package] = [packages[package]]
-                            else:
-                                requirements_dict[package].append(packages[package])
+            # One stat per folder instead of listing and classifying every entry in it
+            file_path = os.path.join(root, dir, 'requirements.txt')
+            if os.path.isfile(file_path):
+                # folder = file_path.split(os.path.abspath(directory))[-1].split("\\")[1]
+                # folder = os.path.basename(os.path.abspath(directory))
+                folder = dir
+                active_requirements = get_active_requirements(file_path)
+                for requirement in active_requirements:
+                    packages = parse_conditional_dependencies(requirement, folder)
+                    for package in packages:
+                        if package not in requirements_dict:
+                            requirements_dict[package] = [packages[package]]
+                        else:
+                            requirements_dict[package].append(packages[package])
 
         sorted_ordered_dict = sort_ordered_dict(requirements_dict)
         # print("sorted_ordered_dict",sorted_ordered_dict)
         result_ordered_dict = combine_names(sorted_ordered_dict)
         # print("result_ordered_dict",result_ordered_dict)
         packages = sorted([i for i in result_ordered_dict], key=str.lower)
+        installed_versions = get_installed_versions([p for p in packages if p not in CUSTOM_REQUIREMENTS])
 
         for package_name in packages:
-            if package_name in ["git", "--extra-index-url"]:
-                print(Fore.GREEN + "\nCustom " + Style.RESET_ALL)
-                values = result_ordered_dict[package_name]
-                for i in values:
-                    print(Fore.BLUE + f"\t{package_name}{i[1]}{i[2]}" + Style.RESET_ALL + f" in {i[3]}")
-            else:
-                # if package_name in ['numpy']:
-                print(Fore.GREEN + "\n" + package_name + Style.RESET_ALL)
-                values = result_ordered_dict[package_name]
-                values_sorted = sorted(values, key=lambda x: x[2] if x[2] is not None else '')
+            # Lines of one package are collected and written with a single call
+            report = []
+            try:
+                if package_name in CUSTOM_REQUIREMENTS:
+                    report.append(Fore.GREEN + "\nCustom " + Style.RESET_ALL)
+                    values = result_ordered_dict[package_name]
+                    for i in values:
+                        report.append(Fore.BLUE + f"\t{package_name}{i[1]}{i[2]}" + Style.RESET_ALL + f" in {i[3]}")
+                else:
+                    # if package_name in ['numpy']:
+                    report.append(Fore.GREEN + "\n" + package_name + Style.RESET_ALL)
+                    values = result_ordered_dict[package_name]
+                    values_sorted = sorted(values, key=lambda x: x[2] if x[2] is not None else '')
 
-                state_of_package = "any"
-                versions = []
-                installed_version = get_installed_version(package_name)
-                latest_version = get_latest_version(package_name)
+                    state_of_package = "any"
+                    versions = []
+                    installed_version = installed_versions.get(normalize_package_name(package_name))
+                    latest_version = get_latest_version(package_name, report)
 
 
-                for i in values_sorted:
-                    installable = f"{i[1] if i[1] else ''}{i[2] if i[2] else 'Any'}" 
-                    print("\t" + installable + f" in {i[-1]}")
+                    for i in values_sorted:
+                        installable = f"{i[1] if i[1] else ''}{i[2] if i[2] else 'Any'}" 
+                        report.append("\t" + installable + f" in {i[-1]}")
                     
-                    if i[1]:
-                        if "<" in i[1]:
-                            if not versions:
-                                versions = get_all_versions(package_name).split(", ")
-                                # print(versions)
-
-                            versions = [v for v in versions if parse_version(v) <= parse_version(i[2])]
-                            if i[1] == "<":
-                                if i[2] in versions:
-                                    versions.remove(i[2])
-                            state_of_package = f"{i[1]}{i[2]}"
-                        elif "==" in i[1]:
-                            state_of_package = f"{i[1]}{i[2]}"
-                            versions = [i[2]]
-                        # else:
-                        #     versions = [latest_version]
-                        #     pass
+                        if i[1]:
+                            if "<" in i[1]:
+                                if not versions:
+                                    versions = get_all_versions(package_name).split(", ")
+                                    # print(versions)
+
+                                upper_bound = parse_version(i[2])
+                                versions = [v for v in versions if parse_version(v) <= upper_bound]
+                                if i[1] == "<":
+                                    if i[2] in versions:
+                                        versions.remove(i[2])
+                                state_of_package = f"{i[1]}{i[2]}"
+                            elif "==" in i[1]:
+                                state_of_package = f"{i[1]}{i[2]}"
+                                versions = [i[2]]
+                            # else:
+                            #     versions = [latest_version]
+                            #     pass
                             
                     
-                    # print(Fore.BLUE + "\t" + installable + Style.RESET_ALL + 
-                    #     f" in {i[-1]} - {Fore.YELLOW}{installed_version}{Style.RESET_ALL} installed - {Fore.RED}{latest_version}{Style.RESET_ALL} last version")
-                    # print("installed_version,latest_version",installed_version,latest_version,installed_version==latest_version)
+                        # print(Fore.BLUE + "\t" + installable + Style.RESET_ALL + 
+                        #     f" in {i[-1]} - {Fore.YELLOW}{installed_version}{Style.RESET_ALL} installed - {Fore.RED}{latest_version}{Style.RESET_ALL} last version")
+                        # print("installed_version,latest_version",installed_version,latest_version,installed_version==latest_version)
 
 
 
-                if not installed_version:
-                    print(Fore.RED + "\tNone" + 
-                        Fore.CYAN + f" pip install {package_name}{i[0] if i[0] else ''}=={latest_version}" +
-                        Style.RESET_ALL )
-                    # values = result_ordered_dict[package_name]
-                elif installed_version == latest_version or (versions and installed_version == versions[0]):
-                    print(f"\tYou have a latest {installed_version} version")
-                else:
-                    if not versions:
-                        versions = [latest_version]
-
-                    print(
-                        Fore.YELLOW + f"\tCan updated from {installed_version} to {versions[0]}" + 
-                        Fore.CYAN + f" pip install {package_name}=={versions[0]}" + Style.RESET_ALL
-                        )
-                    if state_of_package == "any":
-                        print(
-                            Fore.YELLOW + "\tOr update to the latest by command " +
-                            Fore.CYAN + f"pip install --upgrade {package_name}" + Style.RESET_ALL
+                    if not installed_version:
+                        report.append(Fore.RED + "\tNone" + 
+                            Fore.CYAN + f" pip install {package_name}{i[0] if i[0] else ''}=={latest_version}" +
+                            Style.RESET_ALL )
+                        # values = result_ordered_dict[package_name]
+                    elif installed_version == latest_version or (versions and installed_version == versions[0]):
+                        report.append(f"\tYou have a latest {installed_version} version")
+                    else:
+                        if not versions:
+                            versions = [latest_version]
+
+                        report.append(
+                            Fore.YELLOW + f"\tCan updated from {installed_version} to {versions[0]}" + 
+                            Fore.CYAN + f" pip install {package_name}=={versions[0]}" + Style.RESET_ALL
                             )
-                    # print(f"installed_version")
+                        if state_of_package == "any":
+                            report.append(
+                                Fore.YELLOW + "\tOr update to the latest by command " +
+                                Fore.CYAN + f"pip install --upgrade {package_name}" + Style.RESET_ALL
+                                )
+                        # print(f"installed_version")
                     
-                    # break
+                        # break
 
+            finally:
+                # Written even if the package fails, so the error below shows where it stopped
+                sys.stdout.write("\n".join(report) + "\n")
 
 
 
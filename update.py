@@ -1,31 +1,92 @@
 import os
+import sys
 import git
 import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from colorama import init, Fore, Style
 
+# Colors only on a terminal; otherwise they are left out entirely
+# instead of being written and then stripped again by colorama
+if sys.stdout.isatty():
+    GREEN, BLUE, RESET = Fore.GREEN, Fore.BLUE, Style.RESET_ALL
+else:
+    GREEN = BLUE = RESET = ""
+
 # Initialize colorama
 init()
 
+# Repositories are updated concurrently: fetch and pull mostly wait on the network
+# ("jobs" in config.json overrides the number of workers)
+MAX_WORKERS = 8
+
+# Guards the console: one report or one question at a time. Reentrant, because
+# a question first flushes its repository's report under the same lock.
+# A report split by a question is not kept in one piece: its remainder may follow
+# other reports, so it repeats the repository heading (see get_repository_status)
+console_lock = threading.RLock()
+
+# Without a terminal nobody can answer, so questions are skipped instead of blocking
+INTERACTIVE = sys.stdin is not None and sys.stdin.isatty()
+
 # Function to check for a GitHub repository in the directory
 def check_github_repo(directory):
     try:
-        # Check if .git folder (repository) exists in the specified directory
-        git_folder = os.path.join(directory, '.git')
-        if os.path.exists(git_folder):
-            # If .git exists, return the repository path
-            return git_folder
-        else:
-            return None
+        # Stat .git (a folder, or a file for worktrees and submodules): the result
+        # both confirms the repository and identifies it, in a single syscall
+        return os.stat(os.path.join(directory, '.git'))
+    except FileNotFoundError:
+        return None
     except Exception as e:
         print(f"Error checking GitHub repository: {e}")
         return None
 
+# Function to write the collected report lines of one repository in a single call
+def flush_output(output):
+    if output:
+        with console_lock:
+            sys.stdout.write("\n".join(output) + "\n")
+            sys.stdout.flush()
+        output.clear()
+
+# Function to check tracked files for local changes (staged or not)
+def has_local_changes(repo):
+    # One status call covers both the index and the work tree; HEAD and the
+    # branch name are read from the ref files by GitPython, so no git is spawned for them.
+    # Untracked files and edits inside submodules are not walked: the stash would not
+    # take them along anyway (only emptiness matters, so the output stays undecoded bytes)
+    return bool(repo.git.status('--porcelain=v2', '--untracked-files=no', '--ignore-submodules=dirty',
+                                stdout_as_string=False))
+
+# Function to list the commits origin has and the local branch does not, oldest first
+def get_incoming_commits(repo, branch_name):
+    # A single git log formats every commit; no Commit objects are read one by one
+    log = repo.git.log('--reverse', '--format=%aI%n%B%x00', f'{branch_name}..origin/{branch_name}')
+    commits = []
+    for entry in log.split('\x00'):
+        entry = entry.strip('\n')
+        if entry:
+            date, _, message = entry.partition('\n')
+            # Same "YYYY-MM-DD HH:MM:SS+HH:MM" form as str(commit.authored_datetime)
+            commits.append((date.replace('T', ' ', 1), message))
+    return commits
+
+# Function to build the heading lines of a repository report
+def report_header(directory):
+    return ["", GREEN + os.path.basename(directory) + RESET]
+
 # Function to get repository status information
-def get_repository_status(directory):
+def get_repository_status(directory, output, full_fetch=False):
+    repo = None
     try:
         repo = git.Repo(directory)
+        # No credential prompts from parallel workers (they would hang or interleave),
+        # and no optional index.lock for read-only commands such as status
+        repo.git.update_environment(GIT_TERMINAL_PROMPT='0', GIT_OPTIONAL_LOCKS='0')
 
-        print("\t" + repo.remotes[0].url)
+        # Looked up once: every repo.remotes access re-reads the git config
+        origin = repo.remotes.origin
+        output.append("\t" + origin.url)
 
         try:
             current_branch = repo.active_branch
@@ -36,13 +97,23 @@ def get_repository_status(directory):
                 branch_name = branches[0].name
                 repo.heads[branch_name].checkout()
                 current_branch = repo.active_branch
+            elif not INTERACTIVE:
+                output.append("Detached HEAD with several branches, skipped: no terminal to choose a branch")
+                return
             else:
-                print("Found several branches:")
-                for branch in branches:
-                    print(branch.name)
+                with console_lock:
+                    # Show everything collected so far before asking
+                    flush_output(output)
+                    print("Found several branches:")
+                    for branch in branches:
+                        print(branch.name)
+
+                    # Wait for user input for the desired branch name
+                    desired_branch = input("Choose branch for update: ")
 
-                # Wait for user input for the desired branch name
-                desired_branch = input("Choose branch for update: ")
+                # The rest of the report is written later, possibly after other repositories,
+                # so it gets its own heading again
+                output.extend(report_header(directory))
 
                 # Switch to the selected branch
                 repo.heads[desired_branch].checkout()
@@ -53,63 +124,105 @@ def get_repository_status(directory):
             # Set the tracking branch for the current branch
             repo.git.branch('--set-upstream-to', f'origin/{current_branch.name}', current_branch.name)
 
-        repo.remotes.origin.fetch()
-
-        github_commits = list(repo.iter_commits(f'origin/{current_branch.name}'))
-        github_commits.reverse()
-
-        local_commits = {commit.hexsha for commit in repo.iter_commits(current_branch.name)}
+        if full_fetch:
+            origin.fetch()
+        else:
+            # ls-remote transfers no objects: nothing to do if the remote head is already ours
+            # (the full ref name: a bare branch name would also match e.g. refs/heads/feature/<name>)
+            remote_head = repo.git.ls_remote('origin', f'refs/heads/{current_branch.name}').split()
+            # HEAD's SHA straight from the ref files: repo.head.commit would start
+            # a cat-file process just to learn that the object is a commit
+            local_head = git.SymbolicReference.dereference_recursive(repo, 'HEAD')
+            if remote_head and remote_head[0] == local_head:
+                return
 
-        files_edited = False
+            # Only the tracked branch, without tag advertisement
+            origin.fetch(current_branch.name, no_tags=True)
 
-        for commit in github_commits:
-            if commit.hexsha not in local_commits:
-                print(Fore.BLUE + f"--> {commit.authored_datetime}\n{commit.message}".rstrip('\n') + Style.RESET_ALL)
-                files_edited = True
-
-        if repo.is_dirty():
-            try:
-                # Stash local changes
-                repo.git.stash()
-            except git.exc.GitCommandError as e:
-                print(f"Stash error: {e}")
-                return
+        incoming_commits = get_incoming_commits(repo, current_branch.name)
+        for date, message in incoming_commits:
+            output.append(BLUE + f"--> {date}\n{message}".rstrip('\n') + RESET)
+        files_edited = bool(incoming_commits)
 
         if files_edited:
-            print()
-            result = repo.git.pull()
-            print(result)
+            # Local changes only need to be put aside when there is something to pull
+            if has_local_changes(repo):
+                try:
+                    # Stash local changes
+                    repo.git.stash()
+                except git.exc.GitCommandError as e:
+                    output.append(f"Stash error: {e}")
+                    return
+
+            output.append("")
+            # origin was fetched above, so merging it avoids the second fetch `git pull` makes
+            result = repo.git.merge('--ff-only', f'origin/{current_branch.name}')
+            output.append(result)
 
     except Exception as e:
-        print(f"Error getting repository status: {e}")
+        output.append(f"Error getting repository status: {e}")
+    finally:
+        # Stop the cat-file processes now rather than whenever the object is collected
+        if repo is not None:
+            repo.close()
+
+# Function to update one repository and return its report lines
+def update_repository(directory, full_fetch=False):
+    output = report_header(directory)
+    get_repository_status(directory, output, full_fetch)
+    return output
 
 # Main function to iterate through directories and perform checks
 def main():
     try:
         # Specify the path to the directory containing the repositories
         root_directory = os.path.realpath(__file__).replace("\\", "/").rsplit("/", 1)[0]
+        config = {}
         if os.path.exists(os.path.join(root_directory, "config.json")):
             with open(os.path.join(root_directory, "config.json"), "r") as config_file:
                 config = json.load(config_file)
-                if "custom_nodes_path" in config:
-                    custom_nodes_directory = config["custom_nodes_path"]
+        custom_nodes_directory = config.get("custom_nodes_path")
+        # Set "full_fetch": true in config.json to fetch every branch and tag
+        full_fetch = config.get("full_fetch", False)
+        jobs = max(1, int(config.get("jobs", MAX_WORKERS)))
 
         if not custom_nodes_directory:
             custom_nodes_directory = root_directory.rsplit("/", 2)[0] + "/custom_nodes"
 
         # Get a list of all folders in the base directory
-        directories = [os.path.join(custom_nodes_directory, d) for d in os.listdir(custom_nodes_directory) if os.path.isdir(os.path.join(custom_nodes_directory, d))]
+        # scandir takes the entry type from the listing itself, so no extra stat per folder
+        # (sorted by name: scandir order is arbitrary and fixes the report order)
+        with os.scandir(custom_nodes_directory) as entries:
+            directories = [entry.path for entry in sorted(entries, key=lambda entry: entry.name.lower()) if entry.is_dir()]
         directories = [custom_nodes_directory.replace("\\", "/").rsplit("/", 2)[0]] + directories
         
+        # (st_dev, st_ino) of .git identifies a repository, so symlinked
+        # copies of the same repository are only updated once
+        # (st_ino is only unique when non-zero: otherwise the resolved path is the key)
+        seen_repos = set()
+
+        repositories = []
+
         # Iterate through each folder and check for a GitHub repository
         for directory in directories:
-            github_repo_path = check_github_repo(directory)
-            if github_repo_path:
-                print()
-                print(Fore.GREEN + os.path.basename(directory) + Style.RESET_ALL)
-                get_repository_status(directory)
+            git_stat = check_github_repo(directory)
+            if git_stat:
+                if git_stat.st_ino:
+                    identity = (git_stat.st_dev, git_stat.st_ino)
+                else:
+                    identity = os.path.normcase(os.path.realpath(directory))
+                if identity in seen_repos:
+                    continue
+                seen_repos.add(identity)
+                repositories.append(directory)
             else:
                 pass
+
+        # map() yields in submission order, so reports keep the folder order
+        # while later repositories are already being fetched
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for output in executor.map(lambda directory: update_repository(directory, full_fetch), repositories):
+                flush_output(output)
     except Exception as e:
         print(f"An error occurred: {e}")
 
@@ -117,4 +230,6 @@ def main():
 if __name__ == "__main__":
     main()
 
-input("Press Enter to exit...")
\ No newline at end of file
+# Keep the window open for a double-click run; without a terminal there is nobody to press Enter
+if INTERACTIVE:
+    input("Press Enter to exit...")
\ No newline at end of file